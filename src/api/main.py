@@ -1,19 +1,27 @@
+import asyncio
+import hashlib
 import logging
 import os
+import random
 import sys
-import threading
 import time
-from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime
 
+import asyncpg
 import joblib
-import psycopg2
+import numpy as np
+from cachetools import LRUCache
 from fastapi import FastAPI, Response
-from psycopg2 import pool
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
 # Setup Application Insights with Azure Monitor OpenTelemetry
 CONNECTION_STRING = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING", "")
+TELEMETRY_SAMPLING_RATIO = float(os.getenv("TELEMETRY_SAMPLING_RATIO", "0.05"))
 
 # Configure logging - ensure logs go to stdout AND Application Insights
 logger = logging.getLogger(__name__)
@@ -34,27 +42,42 @@ if CONNECTION_STRING:
         from opentelemetry import trace
         from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 
-        # Configure Azure Monitor with the connection string
+        # Configure Azure Monitor with the connection string. Only a fraction
+        # of traces is sampled, decided from the trace id so every span of a
+        # request shares the same decision.
         configure_azure_monitor(
             connection_string=CONNECTION_STRING,
             enable_live_metrics=True,
+            sampling_ratio=TELEMETRY_SAMPLING_RATIO,
         )
 
-        # Get tracer for custom spans
-        tracer = trace.get_tracer(__name__)
-
         logger.info("Azure Monitor OpenTelemetry configured successfully")
         TELEMETRY_ENABLED = True
     except Exception as e:
         logger.warning(f"Failed to configure Azure Monitor OpenTelemetry: {e}")
-        tracer = None
         TELEMETRY_ENABLED = False
 else:
     logger.warning("APPLICATIONINSIGHTS_CONNECTION_STRING not set - telemetry disabled")
-    tracer = None
     TELEMETRY_ENABLED = False
 
-app = FastAPI(title="ML Sentiment API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown of the database pool and background tasks."""
+    await db_pool.initialize()
+    batcher.start()
+    prediction_logger.start()
+    yield
+    await batcher.stop()
+    await prediction_logger.stop()
+    await db_pool.close()
+
+
+app = FastAPI(
+    title="ML Sentiment API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Instrument FastAPI with OpenTelemetry (after app creation)
 if TELEMETRY_ENABLED:
@@ -66,9 +89,65 @@ if TELEMETRY_ENABLED:
     except Exception as e:
         logger.warning(f"Failed to instrument FastAPI: {e}")
 
-model = joblib.load("model.pkl")
+MODEL_PATH = "model.pkl"
+ONNX_MODEL_PATH = "model.onnx"
+# Memory-map the model's numpy arrays so the page cache shares one copy
+# across uvicorn workers and inference processes
+model = joblib.load(MODEL_PATH, mmap_mode="r")
+vectorizer = model.named_steps["tfidf"]
+classifier = model.named_steps["classifier"]
+onnx_session = None
+if not os.path.exists(ONNX_MODEL_PATH):
+    logger.warning(
+        f"{ONNX_MODEL_PATH} not found - serving the joblib pipeline "
+        "(run src/model/train.py to export it)"
+    )
+
+
+def _default_inference_workers() -> int:
+    """CPUs this container may use: affinity mask capped by the cgroup quota."""
+    if not hasattr(os, "sched_getaffinity"):
+        # macOS / Windows - no affinity mask or cgroups
+        return os.cpu_count() or 1
+    cpus = len(os.sched_getaffinity(0))
+    try:
+        # cgroup v2 ("<quota> <period>" or "max <period>")
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+    except OSError:
+        try:
+            # cgroup v1 (quota is -1 when unlimited)
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = f.read().strip()
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = f.read().strip()
+        except OSError:
+            return cpus
+    if quota in ("max", "-1"):
+        return cpus
+    return max(1, min(cpus, int(quota) // int(period)))
+
+
+if "INFERENCE_WORKERS" in os.environ:
+    INFERENCE_WORKERS = int(os.environ["INFERENCE_WORKERS"])
+else:
+    INFERENCE_WORKERS = _default_inference_workers()
+MAX_TEXT_LENGTH = int(os.getenv("MAX_TEXT_LENGTH", "10000"))
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "32"))
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", "5"))
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_LOG_BATCH_SIZE = int(os.getenv("PREDICTION_LOG_BATCH_SIZE", "500"))
+PREDICTION_LOG_FLUSH_MS = float(os.getenv("PREDICTION_LOG_FLUSH_MS", "500"))
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Errors meaning the connection itself is dead, not the query
+CONNECTION_ERRORS = (
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    OSError,
+)
+MIN_DB_CONNECTIONS = int(os.getenv("MIN_DB_CONNECTIONS", "2"))
+MAX_DB_CONNECTIONS = int(os.getenv("MAX_DB_CONNECTIONS", "10"))
 
 # ============================================================
 # DATABASE CONNECTION POOLING WITH GRACEFUL STARTUP
@@ -77,89 +156,122 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 
 class DatabasePool:
     """
-    Manages a connection pool with graceful startup.
+    Manages an asyncpg connection pool with graceful startup.
     If the database is unavailable at startup, the application continues
     running and retries the connection in the background.
     """
 
-    def __init__(self, database_url: str, minconn: int = 2, maxconn: int = 10):
+    def __init__(
+        self,
+        database_url: str,
+        min_size: int = 2,
+        max_size: int = 10,
+        acquire_timeout: float = 30.0,
+        ready_ttl: float = 5.0,
+        recent_ok_window: float = 2.0,
+    ):
         self.database_url = database_url
-        self.minconn = minconn
-        self.maxconn = maxconn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.ready_ttl = ready_ttl
+        self.recent_ok_window = recent_ok_window
+        self._last_ready_check = 0.0
+        self._last_ready = False
+        self._last_ok = 0.0
         self._pool = None
-        self._lock = threading.Lock()
-        self._initialized = False
-        self._init_attempted = False
+        self._retry_task = None
+        self._closed = False
+
+    @property
+    def initialized(self) -> bool:
+        """Whether the connection pool has been created."""
+        return self._pool is not None
 
-    def _create_pool(self) -> bool:
+    async def _create_pool(self) -> bool:
         """Attempt to create the connection pool. Returns True on success."""
         try:
-            self._pool = pool.ThreadedConnectionPool(
-                self.minconn, self.maxconn, self.database_url
+            # asyncpg closes connections idle for longer than 300s and
+            # reconnects ones it already knows are closed; a dead socket is
+            # only detected when a query fails on it (callers retry after
+            # expire_connections()).
+            # Statements are prepared once per connection and kept for its
+            # lifetime, so the logging upsert and metrics query are never
+            # re-parsed by Postgres.
+            self._pool = await asyncpg.create_pool(
+                self.database_url,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                command_timeout=10,
+                max_cached_statement_lifetime=0,
             )
-            self._initialized = True
             logger.info("Database connection pool created successfully")
             return True
         except Exception as e:
             logger.warning(f"Failed to create connection pool: {str(e)}")
             self._pool = None
-            self._initialized = False
             return False
 
-    def initialize(self):
+    async def initialize(self):
         """
         Initialize the connection pool.
         Called at startup - does not crash if database is unavailable.
         """
-        with self._lock:
-            if self._init_attempted:
-                return self._initialized
-            self._init_attempted = True
-
         if self.database_url:
-            success = self._create_pool()
-            if not success:
+            if await self._create_pool():
+                await self._init_table()
+            else:
                 logger.warning(
-                    "Database unavailable at startup. Will retry on first request."
-                )
-                # Start background retry thread
-                retry_thread = threading.Thread(
-                    target=self._background_retry, daemon=True
+                    "Database unavailable at startup. Will retry in the background."
                 )
-                retry_thread.start()
+                self._retry_task = asyncio.create_task(self._background_retry())
         else:
             logger.warning("DATABASE_URL not configured")
 
-        return self._initialized
+        return self.initialized
 
-    def _background_retry(self):
-        """Background thread to retry database connection."""
+    def _ensure_retrying(self):
+        """
+        Restart the background retry if a previous one gave up, so a long
+        database outage doesn't leave the pod permanently not ready.
+        """
+        if not self.database_url or self._closed:
+            return
+        if self._retry_task is None or self._retry_task.done():
+            logger.info("Database unavailable - restarting background retry")
+            self._retry_task = asyncio.create_task(self._background_retry())
+
+    async def _background_retry(self):
+        """
+        Background task to retry database connection.
+        Uses exponential backoff with jitter (so pods don't retry in
+        lockstep) and gives up after max_retry_seconds.
+        """
         retry_count = 0
-        max_retries = 10
-        retry_delay = 5  # seconds
+        max_retry_seconds = 600
+        deadline = time.monotonic() + max_retry_seconds
 
-        while not self._initialized and retry_count < max_retries:
-            time.sleep(retry_delay)
+        while not self.initialized and time.monotonic() < deadline:
+            delay = min(30, 0.5 * (2**retry_count)) + random.uniform(0, 0.5)
+            await asyncio.sleep(min(delay, max(0, deadline - time.monotonic())))
             retry_count += 1
-            logger.info(
-                f"Retrying database connection (attempt {retry_count}/{max_retries})"
-            )
+            logger.info(f"Retrying database connection (attempt {retry_count})")
 
-            with self._lock:
-                if self._create_pool():
-                    self._init_table()
-                    return
+            if await self._create_pool():
+                await self._init_table()
+                return
 
-        if not self._initialized:
-            logger.error(f"Failed to connect to database after {max_retries} attempts")
+        if not self.initialized:
+            logger.error(
+                f"Failed to connect to database after {retry_count} attempts "
+                f"({max_retry_seconds}s)"
+            )
 
-    def _init_table(self):
-        """Initialize the predictions table."""
+    async def _init_table(self):
+        """Initialize the predictions and prediction_buckets tables."""
         try:
-            conn = self.get_connection()
-            if conn:
-                cur = conn.cursor()
-                cur.execute(
+            async with self.acquire() as conn:
+                await conn.execute(
                     """
                     CREATE TABLE IF NOT EXISTS predictions (
                         id SERIAL PRIMARY KEY,
@@ -170,83 +282,310 @@ class DatabasePool:
                     )
                 """
                 )
-                conn.commit()
-                self.return_connection(conn)
-                logger.info("Predictions table initialized")
+                # Per-minute rollup maintained by the prediction logger so
+                # /metrics doesn't have to scan the predictions table
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS prediction_buckets (
+                        minute TIMESTAMP,
+                        sentiment TEXT,
+                        count INT,
+                        sum_conf DOUBLE PRECISION,
+                        PRIMARY KEY (minute, sentiment)
+                    )
+                """
+                )
+            logger.info("Predictions tables initialized")
         except Exception as e:
             logger.error(f"Failed to initialize table: {str(e)}")
 
-    def get_connection(self):
+    @asynccontextmanager
+    async def acquire(self):
         """
-        Get a connection from the pool.
-        Returns None if pool is not available (graceful degradation).
+        Acquire a connection from the pool.
+        Yields None if pool is not available (graceful degradation).
+        Records the time of every block that completes without error, so
+        readiness can be inferred from real traffic.
         """
-        # Try to initialize if not already done
-        if not self._initialized and not self._init_attempted:
-            self.initialize()
-
-        # Retry initialization if previous attempt failed
-        if not self._initialized:
-            with self._lock:
-                if not self._initialized and self.database_url:
-                    if self._create_pool():
-                        self._init_table()
-
-        if self._pool and self._initialized:
-            try:
-                return self._pool.getconn()
-            except Exception as e:
-                logger.error(f"Failed to get connection from pool: {str(e)}")
-                return None
-        return None
-
-    def return_connection(self, conn):
-        """Return a connection to the pool."""
-        if self._pool and conn:
-            try:
-                self._pool.putconn(conn)
-            except Exception as e:
-                logger.error(f"Failed to return connection to pool: {str(e)}")
+        if self._pool is None:
+            self._ensure_retrying()
+            yield None
+            return
+
+        async with self._pool.acquire(timeout=self.acquire_timeout) as conn:
+            yield conn
+        self._last_ok = time.monotonic()
 
-    def is_ready(self) -> bool:
-        """Check if database is ready (for readiness probe)."""
-        if not self._initialized:
+    async def is_ready(self) -> bool:
+        """
+        Check if database is ready (for readiness probe).
+        Any successful database operation in the last recent_ok_window
+        seconds counts as ready. Otherwise the result of a SELECT 1 is cached for ready_ttl
+        seconds so frequent probes and metric scrapes don't each cost a
+        database round-trip (or a timeout when the database is down).
+        """
+        if not self.initialized:
+            self._ensure_retrying()
             return False
 
-        conn = self.get_connection()
-        if conn:
-            try:
-                cur = conn.cursor()
-                cur.execute("SELECT 1")
-                cur.fetchone()
-                self.return_connection(conn)
-                return True
-            except Exception:
-                self.return_connection(conn)
-                return False
-        return False
-
-    def close(self):
+        now = time.monotonic()
+        if now - self._last_ok < self.recent_ok_window:
+            return True
+        if now - self._last_ready_check < self.ready_ttl:
+            return self._last_ready
+
+        try:
+            async with self.acquire() as conn:
+                if conn is None:
+                    ready = False
+                else:
+                    await conn.fetchval("SELECT 1")
+                    ready = True
+        except Exception:
+            ready = False
+
+        self._last_ready_check = now
+        self._last_ready = ready
+        return ready
+
+    async def expire_connections(self):
+        """Replace every pooled connection on its next acquire."""
+        if self._pool:
+            await self._pool.expire_connections()
+
+    async def close(self):
         """Close all connections in the pool."""
+        self._closed = True
+        if self._retry_task:
+            self._retry_task.cancel()
         if self._pool:
-            self._pool.closeall()
+            await self._pool.close()
             logger.info("Database connection pool closed")
 
 
-# Initialize database pool (graceful startup - won't crash if DB is down)
-db_pool = DatabasePool(DATABASE_URL)
-db_pool.initialize()
+# Database pool is initialized in the lifespan handler (graceful startup -
+# won't crash if DB is down)
+db_pool = DatabasePool(DATABASE_URL, MIN_DB_CONNECTIONS, MAX_DB_CONNECTIONS)
 
 
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections."""
-    conn = db_pool.get_connection()
-    try:
-        yield conn
-    finally:
-        if conn:
-            db_pool.return_connection(conn)
+# ============================================================
+# MICRO-BATCHED INFERENCE
+# ============================================================
+
+
+def _load_model(path: str, onnx_path: str = None):
+    """
+    Process pool initializer - loads the model once per worker process.
+    Prefers the ONNX export when available and falls back to the joblib
+    pipeline otherwise.
+    """
+    global model, vectorizer, classifier, onnx_session
+    if onnx_path and os.path.exists(onnx_path):
+        try:
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            # One thread per worker - the process pool already uses every core
+            options.intra_op_num_threads = 1
+            onnx_session = onnxruntime.InferenceSession(
+                onnx_path, options, providers=["CPUExecutionProvider"]
+            )
+            return
+        except Exception as e:
+            logger.warning(f"Failed to load ONNX model, using joblib: {e}")
+    model = joblib.load(path, mmap_mode="r")
+    vectorizer = model.named_steps["tfidf"]
+    classifier = model.named_steps["classifier"]
+
+
+def _infer(texts):
+    """Run the model on a batch of texts. Returns [(sentiment, confidence)]."""
+    if onnx_session is not None:
+        labels, probas = onnx_session.run(
+            None, {"text": np.array(texts, dtype=object).reshape(-1, 1)}
+        )
+        return [
+            (str(label), float(proba.max())) for label, proba in zip(labels, probas)
+        ]
+
+    # Vectorize once and feed the sparse matrix straight to the classifier
+    X = vectorizer.transform(texts)
+    if len(classifier.classes_) == 2:
+        # For binary logistic regression the top-class probability is
+        # sigmoid(|decision|), so skip building the probability matrix
+        scores = classifier.decision_function(X)
+        labels = classifier.classes_[(scores > 0).astype(int)]
+        confidences = 1.0 / (1.0 + np.exp(-np.abs(scores)))
+        return [
+            (str(label), float(confidence))
+            for label, confidence in zip(labels, confidences)
+        ]
+
+    probas = classifier.predict_proba(X)
+    indices = np.argmax(probas, axis=1)
+    return [
+        (str(classifier.classes_[idx]), float(proba[idx]))
+        for proba, idx in zip(probas, indices)
+    ]
+
+
+class PredictionBatcher:
+    """
+    Collects concurrent prediction requests into micro-batches.
+    A background task waits up to max_wait_ms for more requests to arrive
+    and then runs predict_proba once for the whole batch, so the TF-IDF
+    vectorizer and classifier are invoked once per batch instead of twice
+    per request.
+    Batches run in a process pool so inference uses every core instead of
+    being serialized by the GIL.
+    Results are memoized in an LRU cache keyed by a digest of the input
+    text, so repeated texts skip inference entirely.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        onnx_model_path: str = None,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        cache_size: int = 10000,
+        workers: int = 1,
+    ):
+        self.model_path = model_path
+        self.onnx_model_path = onnx_model_path
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        # Only touched from the event loop, so no lock is needed
+        self._cache = LRUCache(maxsize=cache_size)
+        self._executor = None
+        self._slots = None
+        self._queue = None
+        self._task = None
+        self._inflight = set()
+        self._broken = False
+
+    def start(self):
+        """Start the worker processes and the background batching task."""
+        if self._task is None:
+            self._executor = self._new_executor()
+            self._slots = asyncio.Semaphore(self.workers)
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_load_model,
+            initargs=(self.model_path, self.onnx_model_path),
+        )
+
+    @property
+    def healthy(self) -> bool:
+        """False while the worker pool keeps breaking even after a restart."""
+        return not self._broken
+
+    async def stop(self):
+        """Cancel the background batching task and shut down the workers."""
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for task in list(self._inflight):
+            task.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def predict(self, text: str):
+        """Queue a text for prediction. Returns (sentiment, confidence)."""
+        # Key on a fixed-size digest so cached texts don't pin their memory
+        key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        result = await future
+        self._cache[key] = result
+        return result
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Keep at most one batch in flight per worker process
+            await self._slots.acquire()
+            task = asyncio.create_task(self._process(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _process(self, batch):
+        texts = [text for text, _ in batch]
+        try:
+            results = await self._infer(texts)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Batch prediction failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _infer(self, texts):
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            results = await loop.run_in_executor(executor, _infer, texts)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed) - replace the pool and retry once
+            logger.error("Inference process pool broken - restarting workers")
+            self._replace_executor(executor)
+            try:
+                results = await loop.run_in_executor(self._executor, _infer, texts)
+            except BrokenProcessPool:
+                self._broken = True
+                raise
+        self._broken = False
+        return results
+
+    def _replace_executor(self, broken):
+        # Concurrent batches may all see the same broken pool; replace it once
+        if self._executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+
+batcher = PredictionBatcher(
+    MODEL_PATH,
+    ONNX_MODEL_PATH,
+    PREDICT_MAX_BATCH_SIZE,
+    PREDICT_MAX_WAIT_MS,
+    PREDICTION_CACHE_SIZE,
+    INFERENCE_WORKERS,
+)
 
 
 # ============================================================
@@ -254,29 +593,165 @@ def get_db_connection():
 # ============================================================
 
 
-def log_prediction(text: str, sentiment: str, confidence: float):
+class PredictionLogger:
     """
-    Log prediction to database with error isolation.
-    If database is unavailable, the error is logged but does not
-    affect the prediction response.
+    Buffers predictions in memory and writes them to the database in bulk.
+    A background task flushes the buffer every flush_interval_ms (or as soon
+    as batch_size rows are pending) with the binary COPY protocol, so one
+    round-trip and one commit cover the whole batch. The per-minute
+    prediction_buckets rollup is updated in the same transaction and pruned
+    to the last two hours once a minute.
+    If the database is unavailable, the rows are dropped and the error is
+    logged - prediction responses are never affected.
     """
-    try:
-        with get_db_connection() as conn:
-            if conn is None:
-                logger.warning("Database unavailable - prediction not logged")
-                return False
 
-            cur = conn.cursor()
-            cur.execute(
-                "INSERT INTO predictions (text, sentiment, confidence) VALUES (%s, %s, %s)",
-                (text, sentiment, confidence),
+    def __init__(
+        self,
+        db_pool: DatabasePool,
+        batch_size: int = 500,
+        flush_interval_ms: float = 500,
+        max_buffered: int = 10000,
+    ):
+        self.db_pool = db_pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_buffered = max_buffered
+        self._buffer = deque()
+        self._dropped = 0
+        self._wakeup = None
+        self._task = None
+        self._stopping = False
+        self._last_prune = 0.0
+
+    def start(self):
+        """Start the background flush task on the running event loop."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flush task and write any pending rows."""
+        if self._task:
+            # Let an in-flight flush finish instead of cancelling its COPY
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def log(self, text: str, sentiment: str, confidence: float):
+        """Queue a prediction for logging. Never blocks the caller."""
+        if len(self._buffer) >= self.max_buffered:
+            # Database can't keep up - drop the row, reported on next flush
+            self._dropped += 1
+            return
+
+        self._buffer.append((text, str(sentiment), float(confidence)))
+        if self._wakeup and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self):
+        while not self._stopping:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+            await self._prune_buckets()
+
+    @staticmethod
+    def _aggregate(rows):
+        """
+        Sum rows into (sentiment, count, sum_conf) bucket increments.
+        Sorted by sentiment so every pod locks bucket rows in the same order
+        and concurrent flushes can't deadlock.
+        """
+        buckets = {}
+        for _, sentiment, confidence in rows:
+            count, sum_conf = buckets.get(sentiment, (0, 0.0))
+            buckets[sentiment] = (count + 1, sum_conf + confidence)
+        return [
+            (sentiment, count, sum_conf)
+            for sentiment, (count, sum_conf) in sorted(buckets.items())
+        ]
+
+    async def flush(self):
+        """Write all buffered predictions to the database."""
+        if self._dropped:
+            logger.warning(f"Log buffer full - {self._dropped} predictions not logged")
+            self._dropped = 0
+
+        while self._buffer:
+            rows = [
+                self._buffer.popleft()
+                for _ in range(min(self.batch_size, len(self._buffer)))
+            ]
+            for attempt in range(2):
+                try:
+                    async with self.db_pool.acquire() as conn:
+                        if conn is None:
+                            logger.warning(
+                                f"Database unavailable - {len(rows)} predictions not logged"
+                            )
+                            break
+
+                        await self._write(conn, rows)
+                        logger.info(f"Logged {len(rows)} predictions")
+                    break
+                except CONNECTION_ERRORS as e:
+                    if attempt == 0:
+                        # Pooled connections go stale when Postgres restarts -
+                        # replace them all and retry once on a fresh one
+                        logger.warning(f"Database connection lost, retrying: {e!r}")
+                        await self.db_pool.expire_connections()
+                        continue
+                    logger.error(f"Failed to log {len(rows)} predictions: {str(e)}")
+                except Exception as e:
+                    logger.error(f"Failed to log {len(rows)} predictions: {str(e)}")
+                    break
+
+    async def _write(self, conn, rows):
+        """COPY rows into predictions and update their buckets atomically."""
+        async with conn.transaction():
+            await conn.copy_records_to_table(
+                "predictions",
+                records=rows,
+                columns=("text", "sentiment", "confidence"),
             )
-            conn.commit()
-            logger.info(f"Prediction logged: {sentiment} ({confidence:.2f})")
-            return True
-    except Exception as e:
-        logger.error(f"Failed to log prediction: {str(e)}")
-        return False
+            await conn.executemany(
+                """
+                INSERT INTO prediction_buckets
+                    (minute, sentiment, count, sum_conf)
+                VALUES (date_trunc('minute', CURRENT_TIMESTAMP), $1, $2, $3)
+                ON CONFLICT (minute, sentiment) DO UPDATE
+                SET count = prediction_buckets.count + EXCLUDED.count,
+                    sum_conf = prediction_buckets.sum_conf + EXCLUDED.sum_conf
+            """,
+                self._aggregate(rows),
+            )
+
+    async def _prune_buckets(self):
+        """Delete rollup rows older than the /metrics window, once a minute."""
+        now = time.monotonic()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+
+        try:
+            async with self.db_pool.acquire() as conn:
+                if conn is not None:
+                    await conn.execute(
+                        """
+                        DELETE FROM prediction_buckets
+                        WHERE minute < NOW() - INTERVAL '2 hours'
+                    """
+                    )
+        except Exception as e:
+            logger.error(f"Failed to prune prediction buckets: {str(e)}")
+
+
+prediction_logger = PredictionLogger(
+    db_pool, PREDICTION_LOG_BATCH_SIZE, PREDICTION_LOG_FLUSH_MS
+)
 
 
 # ============================================================
@@ -288,70 +763,105 @@ class TextInput(BaseModel):
     text: str
 
 
+HEALTHY_RESPONSE = {"status": "healthy"}
+
+_timestamp_cache = [0.0, ""]
+
+
+def now_iso() -> str:
+    """Current time in ISO 8601, formatted at most once per second."""
+    now = time.time()
+    if now - _timestamp_cache[0] >= 1.0:
+        _timestamp_cache[0] = now
+        _timestamp_cache[1] = datetime.fromtimestamp(now).isoformat()
+    return _timestamp_cache[1]
+
+
 @app.post("/predict")
-def predict(input: TextInput):
+async def predict(input: TextInput):
     """
     Make a sentiment prediction.
     Predictions succeed even if database logging fails (error isolation).
     """
     start_time = time.time()
 
+    # Empty input carries no sentiment - skip the model entirely
+    text = input.text.strip()
+    if not text:
+        return ORJSONResponse(
+            {"sentiment": "neutral", "confidence": 0.0, "latency_ms": 0.0}
+        )
+
+    # TF-IDF cost is linear in text length, so bound it
+    text = text[:MAX_TEXT_LENGTH]
+
     # Make prediction (core functionality - always works)
-    prediction = model.predict([input.text])[0]
-    proba = model.predict_proba([input.text])[0]
-    confidence = max(proba)
+    prediction, confidence = await batcher.predict(text)
 
-    # Log to database (non-blocking - failures don't affect response)
-    log_prediction(input.text, prediction, confidence)
+    # Buffer for bulk logging to database (failures don't affect response)
+    prediction_logger.log(input.text, prediction, confidence)
 
     # Calculate latency
     latency_ms = (time.time() - start_time) * 1000
 
-    # Log with OpenTelemetry tracing
-    if tracer:
-        with tracer.start_as_current_span("prediction_metrics") as span:
-            span.set_attribute("prediction.sentiment", prediction)
-            span.set_attribute("prediction.confidence", float(confidence))
-            span.set_attribute("prediction.latency_ms", latency_ms)
-            span.set_attribute("prediction.text_length", len(input.text))
+    # Attach prediction details to the request span created by the FastAPI
+    # instrumentation (skipped when the request is sampled out)
+    if TELEMETRY_ENABLED:
+        span = trace.get_current_span()
+        if span.is_recording():
+            span.set_attributes(
+                {
+                    "prediction.sentiment": str(prediction),
+                    "prediction.confidence": float(confidence),
+                    "prediction.latency_ms": latency_ms,
+                    "prediction.text_length": len(input.text),
+                }
+            )
 
     logger.info(
         f"Prediction: {prediction}, Confidence: {confidence:.2f}, Latency: {latency_ms:.2f}ms"
     )
 
-    return {
-        "sentiment": prediction,
-        "confidence": float(confidence),
-        "latency_ms": latency_ms,
-    }
+    # Returning the response directly skips FastAPI's jsonable_encoder pass
+    return ORJSONResponse(
+        {
+            "sentiment": prediction,
+            "confidence": float(confidence),
+            "latency_ms": latency_ms,
+        }
+    )
 
 
 @app.get("/health")
-def health():
+def health(response: Response):
     """
     Liveness probe - checks if the application is running.
-    Returns healthy as long as the API can respond.
+    Returns healthy as long as the API can respond and the inference
+    workers can be restarted.
     Does NOT check database (use /ready for that).
     """
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    if not batcher.healthy:
+        response.status_code = 503
+        return {"status": "unhealthy"}
+    return HEALTHY_RESPONSE
 
 
 @app.get("/ready")
-def ready(response: Response):
+async def ready(response: Response):
     """
     Readiness probe - checks if the application is ready to serve traffic.
     Verifies database connectivity and model availability.
     """
     checks = {"model": False, "database": False}
 
-    # Check model is loaded
+    # Check model is loaded and the inference workers are usable
     try:
-        checks["model"] = model is not None
+        checks["model"] = model is not None and batcher.healthy
     except Exception:
         checks["model"] = False
 
     # Check database connectivity
-    checks["database"] = db_pool.is_ready()
+    checks["database"] = await db_pool.is_ready()
 
     all_ready = all(checks.values())
 
@@ -360,73 +870,58 @@ def ready(response: Response):
         return {
             "status": "not_ready",
             "checks": checks,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso(),
         }
 
     return {
         "status": "ready",
         "checks": checks,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now_iso(),
     }
 
 
 @app.get("/metrics")
-def metrics():
+async def metrics():
     """Prometheus-compatible metrics endpoint"""
     try:
-        with get_db_connection() as conn:
+        async with db_pool.acquire() as conn:
             if conn is None:
                 return "# Database unavailable\n"
 
-            cur = conn.cursor()
-
-            # Get prediction counts by sentiment
-            cur.execute(
+            # Get prediction counts by sentiment and the overall average
+            # confidence from the per-minute rollup (at most 60 rows per
+            # sentiment, regardless of traffic)
+            results = await conn.fetch(
                 """
-                SELECT sentiment, COUNT(*) as count
-                FROM predictions
-                WHERE timestamp > NOW() - INTERVAL '1 hour'
+                SELECT sentiment,
+                       SUM(count) AS count,
+                       SUM(SUM(sum_conf)) OVER () / SUM(SUM(count)) OVER ()
+                           AS avg_confidence
+                FROM prediction_buckets
+                WHERE minute > NOW() - INTERVAL '1 hour'
                 GROUP BY sentiment
             """
             )
-            results = cur.fetchall()
 
-            # Get average confidence
-            cur.execute(
-                """
-                SELECT AVG(confidence) as avg_confidence
-                FROM predictions
-                WHERE timestamp > NOW() - INTERVAL '1 hour'
-            """
-            )
-            avg_conf = cur.fetchone()[0] or 0
+        avg_conf = (results[0]["avg_confidence"] if results else None) or 0
 
-            metrics_output = "# HELP predictions_total Total number of predictions\n"
-            metrics_output += "# TYPE predictions_total counter\n"
+        metrics_output = "# HELP predictions_total Total number of predictions\n"
+        metrics_output += "# TYPE predictions_total counter\n"
 
-            for sentiment, count in results:
-                metrics_output += (
-                    f'predictions_total{{sentiment="{sentiment}"}} {count}\n'
-                )
+        for sentiment, count, _ in results:
+            metrics_output += f'predictions_total{{sentiment="{sentiment}"}} {count}\n'
 
-            metrics_output += (
-                "\n# HELP average_confidence Average prediction confidence\n"
-            )
-            metrics_output += "# TYPE average_confidence gauge\n"
-            metrics_output += f"average_confidence {avg_conf}\n"
+        metrics_output += "\n# HELP average_confidence Average prediction confidence\n"
+        metrics_output += "# TYPE average_confidence gauge\n"
+        metrics_output += f"average_confidence {avg_conf}\n"
 
-            # Add database pool status
-            metrics_output += "\n# HELP db_pool_ready Database pool readiness\n"
-            metrics_output += "# TYPE db_pool_ready gauge\n"
-            metrics_output += f"db_pool_ready {1 if db_pool.is_ready() else 0}\n"
+        # Add database pool status (after the connection is released, so the
+        # query above counts as a recent success and no second connection is used)
+        metrics_output += "\n# HELP db_pool_ready Database pool readiness\n"
+        metrics_output += "# TYPE db_pool_ready gauge\n"
+        metrics_output += f"db_pool_ready {1 if await db_pool.is_ready() else 0}\n"
 
-            return metrics_output
+        return metrics_output
     except Exception as e:
         logger.error(f"Metrics endpoint failed: {str(e)}")
         return "# Error generating metrics\n"
-
-
-@app.on_event("shutdown")
-def shutdown_event():
-    """Cleanup on application shutdown."""
-    db_pool.close()
@@ -1,5 +1,9 @@
 import joblib
+import numpy as np
+import onnxruntime
 import pandas as pd
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import StringTensorType
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
@@ -18,11 +22,47 @@ df = pd.DataFrame(data, columns=["text", "sentiment"])
 # Create simple pipeline
 model = Pipeline(
     [
-        ("tfidf", TfidfVectorizer(max_features=1000)),
+        ("tfidf", TfidfVectorizer(max_features=1000, dtype=np.float32)),
         ("classifier", LogisticRegression()),
     ]
 )
 
 model.fit(df["text"], df["sentiment"])
-joblib.dump(model, "model.pkl")
+
+# Store classifier weights as float32 for inference (halves the memory
+# traffic of the sparse TF-IDF dot product)
+classifier = model.named_steps["classifier"]
+classifier.coef_ = classifier.coef_.astype(np.float32)
+classifier.intercept_ = classifier.intercept_.astype(np.float32)
+
+# Uncompressed so the API can memory-map the arrays
+joblib.dump(model, "model.pkl", compress=0)
+
+# Export to ONNX so the API can serve the whole pipeline from ONNX Runtime
+onx = convert_sklearn(
+    model,
+    initial_types=[("text", StringTensorType([None, 1]))],
+    # The default en_US.UTF-8 locale isn't available in slim images
+    options={
+        id(classifier): {"zipmap": False},
+        id(model.named_steps["tfidf"]): {"locale": "C.UTF-8"},
+    },
+)
+
+# The ONNX tokenizer can diverge from sklearn's (e.g. locale handling), so
+# check both give the same predictions before shipping the export
+session = onnxruntime.InferenceSession(
+    onx.SerializeToString(), providers=["CPUExecutionProvider"]
+)
+onnx_labels, onnx_probas = session.run(
+    None, {"text": df["text"].to_numpy(dtype=object).reshape(-1, 1)}
+)
+if not (onnx_labels == model.predict(df["text"])).all():
+    raise RuntimeError("ONNX labels differ from sklearn")
+if not np.allclose(onnx_probas, model.predict_proba(df["text"]), atol=1e-5):
+    raise RuntimeError("ONNX probabilities differ from sklearn")
+
+with open("model.onnx", "wb") as f:
+    f.write(onx.SerializeToString())
+
 print("✅ Model trained and saved!")